@@ -4,9 +4,10 @@ from flask_login import LoginManager
 from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timedelta, datetime
 import os
+from .database import RoutingSession
 
 # Initialize Extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app():
@@ -22,6 +23,10 @@ def create_app():
     app.config['SESSION_COOKIE_SECURE'] = True
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
     
+    # Sessions: 'cookie' (Flask's signed cookie) or server-side 'sql' / 'memory'
+    app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'cookie')
+    app.config['SESSION_SWEEP_INTERVAL'] = int(os.environ.get('SESSION_SWEEP_INTERVAL', '600'))
+
     # Remember Me
     app.config['REMEMBER_COOKIE_SECURE'] = True
     app.config['REMEMBER_COOKIE_HTTPONLY'] = True
@@ -35,22 +40,76 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = db_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        "pool_pre_ping": True,
-        "pool_recycle": 300,
-    }
+    app.config['AUTO_BOOTSTRAP'] = os.environ.get('AUTO_BOOTSTRAP', '1') == '1'
+
+    # Requests one worker serves at once (set by gunicorn.conf.py); sizes the DB pool.
+    app.config['WORKER_CONCURRENCY'] = int(os.environ.get('WORKER_CONCURRENCY', '1'))
+    from .database import engine_options, init_sqlite_pragmas
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_url, app.config['WORKER_CONCURRENCY'])
+
+    # Optional read replica: @read_replica views (dashboard, search, exports) read from it
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        if replica_url.startswith("postgres://"):
+            replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+        app.config['SQLALCHEMY_BINDS'] = {'replica': replica_url}
+    app.config['SQLITE_WAL'] = os.environ.get('SQLITE_WAL', '1') == '1'
+
+    # Instrumentation (opt-in): per-request timing, SQL counts, /metrics, sampled cProfile
+    app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION', '0') == '1'
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '10'))
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    app.config['PROFILE_THRESHOLD_MS'] = float(os.environ.get('PROFILE_THRESHOLD_MS', '500'))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+
+    # Password hashing: werkzeug method ('pbkdf2:sha256', 'scrypt:32768:8:1') or 'argon2[:t:m:p]'
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    app.config['PASSWORD_HASH_WAIT'] = float(os.environ.get('PASSWORD_HASH_WAIT', '5'))
+
+    # Login/register throttling: failure budgets per IP and per (IP, email), checked before any hashing
+    app.config['LOGIN_IP_BURST'] = int(os.environ.get('LOGIN_IP_BURST', '100'))
+    app.config['LOGIN_IP_PER_MINUTE'] = float(os.environ.get('LOGIN_IP_PER_MINUTE', '30'))
+    app.config['LOGIN_EMAIL_BURST'] = int(os.environ.get('LOGIN_EMAIL_BURST', '5'))
+    app.config['LOGIN_EMAIL_PER_MINUTE'] = float(os.environ.get('LOGIN_EMAIL_PER_MINUTE', '3'))
+
+    # Typeahead for admin.api_search: in-memory prefix index instead of ilike per keystroke
+    app.config['AUTOCOMPLETE'] = os.environ.get('AUTOCOMPLETE', '1') == '1'
+    # Build it in the gunicorn master (preload_app) instead of per worker on first search
+    app.config['AUTOCOMPLETE_PRELOAD'] = os.environ.get('AUTOCOMPLETE_PRELOAD', '0') == '1'
+    app.config['AUTOCOMPLETE_CACHE_SIZE'] = int(os.environ.get('AUTOCOMPLETE_CACHE_SIZE', '2048'))
+    # Poll max(id)/count(*) for changes from other workers; full rebuild picks up edits made elsewhere
+    app.config['AUTOCOMPLETE_CHECK_SECONDS'] = float(os.environ.get('AUTOCOMPLETE_CHECK_SECONDS', '5'))
+    app.config['AUTOCOMPLETE_REBUILD_SECONDS'] = float(os.environ.get('AUTOCOMPLETE_REBUILD_SECONDS', '3600'))
 
     # Init
     db.init_app(app)
     login_manager.init_app(app)
+    if app.config['SQLITE_WAL']:
+        init_sqlite_pragmas(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
 
-    from .models import User, SiteFlag
+    if app.config['SESSION_BACKEND'] != 'cookie':
+        from .sessions import ServerSideSessionInterface, STORES
+        app.session_interface = ServerSideSessionInterface(STORES[app.config['SESSION_BACKEND']]())
+
+    from .ratelimit import TokenBucket
+    app.extensions['login_buckets'] = {
+        'ip': TokenBucket(app.config['LOGIN_IP_BURST'], app.config['LOGIN_IP_PER_MINUTE']),
+        'email': TokenBucket(app.config['LOGIN_EMAIL_BURST'], app.config['LOGIN_EMAIL_PER_MINUTE']),
+    }
+
+    from .models import User
     @login_manager.user_loader
     def load_user(user_id):
         return User.query.get(int(user_id))
     
+    if app.config['INSTRUMENTATION']:
+        from .instrumentation import init_instrumentation
+        init_instrumentation(app)
+
     # --- Context Processor (Auto-Year) ---
     @app.context_processor
     def inject_current_year():
@@ -76,16 +135,17 @@ def create_app():
         return redirect(url_for('admin.dashboard'))
 
     # --- BOOTSTRAP: Create DB & Backfill Flag ---
-    with app.app_context():
-        db.create_all()
-        
-        try:
-            if not SiteFlag.query.filter_by(key='first_admin_created').first():
-                if User.query.filter_by(role='Admin').count() > 0:
-                    db.session.add(SiteFlag(key='first_admin_created', value='1'))
-                    db.session.commit()
-                    print("System: Backfilled 'first_admin_created' flag.")
-        except Exception:
-            db.session.rollback()
+    # Production runs this once via `flask init-db` and sets AUTO_BOOTSTRAP=0,
+    # so gunicorn workers skip create_all() and the backfill queries on boot.
+    from .bootstrap import bootstrap_db, register_cli
+    register_cli(app)
+    if app.config['AUTO_BOOTSTRAP']:
+        with app.app_context():
+            bootstrap_db()
+
+    # Only hooks up change tracking; the index is built later (see autocomplete.preload)
+    if app.config['AUTOCOMPLETE']:
+        from .autocomplete import init_autocomplete
+        init_autocomplete(app)
 
     return app
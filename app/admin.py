@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, current_app
 from flask_login import login_required, current_user
 from functools import wraps
 from sqlalchemy import or_
 from .models import User, Quotation, ProductData, db
+from .database import read_replica
 import csv
 from io import StringIO
 from datetime import datetime
@@ -23,6 +24,7 @@ def admin_required(fn):
 # --- DASHBOARD & SEARCH ---
 @admin_bp.route('/dashboard', methods=['GET'])
 @login_required
+@read_replica
 def dashboard():
     search_query = request.args.get('q', '').strip()
     try:
@@ -59,6 +61,7 @@ def attendance():
 
 @admin_bp.route('/attendance/export')
 @login_required
+@read_replica
 def export_attendance():
     si = StringIO()
     cw = csv.writer(si)
@@ -80,6 +83,7 @@ def expenses():
 
 @admin_bp.route('/expenses/export')
 @login_required
+@read_replica
 def export_expenses():
     si = StringIO()
     cw = csv.writer(si)
@@ -118,8 +122,28 @@ def manage_users():
 
 @admin_bp.route('/api/search')
 @login_required
+@read_replica
 def api_search():
     q = request.args.get('q', '').strip()
     if len(q) < 2: return jsonify({'results': []})
+    if current_app.config['AUTOCOMPLETE']:
+        from . import autocomplete
+        live = autocomplete.current()
+        if live is not None:
+            hits = live.suggest(q, k=5)
+            return jsonify({'results': [{'item': item, 'make': make, 'rate': rate} for item, make, rate in hits]})
+    # Also serves while the first index build runs
     products = ProductData.query.filter(ProductData.item_description.ilike(f'%{q}%')).limit(5).all()
     return jsonify({'results': [{'item': p.item_description, 'make': p.make, 'rate': p.rate} for p in products]})
+
+@admin_bp.route('/api/search/stats')
+@login_required
+@admin_required
+def api_search_stats():
+    if not current_app.config['AUTOCOMPLETE']:
+        return jsonify({'enabled': False})
+    from . import autocomplete
+    live = autocomplete.current()
+    if live is None:
+        return jsonify({'enabled': True, 'built': False})
+    return jsonify({'enabled': True, 'built': True, **live.stats()})
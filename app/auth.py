@@ -1,11 +1,29 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import IntegrityError
 from .models import User, SiteFlag, db
+from .passwords import hash_password, verify_password, HashingBusy
 
 auth_bp = Blueprint('auth', __name__)
 
+def _bucket_keys(email):
+    # The account bucket is per (IP, email), so failures from elsewhere can't lock a user out.
+    ip = request.remote_addr
+    return (('ip', ip), ('email', (ip, (email or '').lower().strip())))
+
+def _throttled(email):
+    # Cheap token-bucket check; runs before any password hashing.
+    buckets = current_app.extensions['login_buckets']
+    return any(buckets[kind].empty(key) for kind, key in _bucket_keys(email))
+
+def _charge(email):
+    # Only failed logins (and every registration) spend tokens. Once an address
+    # has spent its whole failure budget, every login from it waits for a refill,
+    # correct ones included; the IP budget is sized for a shared office NAT.
+    buckets = current_app.extensions['login_buckets']
+    for kind, key in _bucket_keys(email):
+        buckets[kind].charge(key)
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
@@ -16,11 +34,22 @@ def register():
         email = request.form.get('email').lower().strip()
         password = request.form.get('password')
 
+        if _throttled(email):
+            flash('Too many attempts. Please wait a minute and try again.', 'danger')
+            return render_template('register.html'), 429
+        _charge(email)
+
         # Basic Check
         if User.query.filter_by(email=email).first():
             flash('Email already exists.', 'danger')
             return redirect(url_for('auth.register'))
         
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            flash('Server is busy. Please try again.', 'warning')
+            return render_template('register.html'), 503
+
         role = 'Employee'
         
         # 1. Race-Safe Admin Claim
@@ -38,7 +67,7 @@ def register():
             new_user = User(
                 username=username, 
                 email=email, 
-                password_hash=generate_password_hash(password, method='pbkdf2:sha256'),
+                password_hash=password_hash,
                 role=role
             )
             db.session.add(new_user)
@@ -47,7 +76,6 @@ def register():
             # Auto-Login
             session.clear()
             login_user(new_user)
-            session.modified = True
             
             flash(f'Welcome! You have been registered as {role}.', 'success')
             return redirect(url_for('admin.dashboard'))
@@ -67,15 +95,31 @@ def login():
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
+
+        if _throttled(email):
+            flash('Too many login attempts. Please wait a minute and try again.', 'danger')
+            return render_template('login.html'), 429
         
         user = User.query.filter_by(email=email).first()
+
+        ok = False
+        if user:
+            try:
+                ok, new_hash = verify_password(user.password_hash, password)
+            except HashingBusy:
+                flash('Server is busy. Please try again.', 'warning')
+                return render_template('login.html'), 503
+            if ok and new_hash:
+                # Hashing parameters changed since this password was stored
+                user.password_hash = new_hash
+                db.session.commit()
         
-        if user and check_password_hash(user.password_hash, password):
+        if ok:
             session.clear()
             login_user(user, remember=True)
-            session.modified = True
             return redirect(url_for('admin.dashboard'))
         else:
+            _charge(email)
             flash('Login failed.', 'danger')
             
     return render_template('login.html')
@@ -85,6 +129,5 @@ def login():
 def logout():
     logout_user()
     session.clear()
-    session.modified = True
     flash('Logged out.', 'info')
     return redirect(url_for('auth.login'))
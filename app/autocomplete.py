@@ -0,0 +1,440 @@
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from . import db
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def _tokens(item, cat_no, make):
+    keys = set(TOKEN_RE.findall((item or '').lower()))
+    for extra in (cat_no, make):
+        if extra:
+            keys.add(extra.lower().strip())
+            keys.update(TOKEN_RE.findall(extra.lower()))
+    # Single characters stay in, so 'ph 7' or 'grade a' still find their rows.
+    return [sys.intern(k) for k in keys if k]
+
+
+class PrefixIndex:
+    """
+    Typeahead over ProductData descriptions, catalog numbers and makes.
+
+    Every token maps to a suggestion (one per distinct description+make, weighted by
+    how many rows share it) through two parallel sorted arrays, so a prefix lookup is
+    two bisects plus a scan of the matching slice. Results for hot prefixes sit in an
+    LRU cache. A suggestion shows the rate of the row indexed last: the newest quote,
+    or the latest edit made in this process. If that row later leaves the group, its
+    rate stays until the next rebuild.
+
+    Requests only read an index. Building it, polling and catching up run on the
+    refresher thread (see `current()`), and a rebuild fills a fresh instance that
+    is swapped in when done.
+
+    ORM changes made in this process apply when their transaction commits. Changes
+    from other workers, Core inserts or raw SQL are found by polling max(id) and
+    count(*) every `check_seconds`: new ids are caught up through the watermark,
+    a count mismatch (deletes elsewhere) calls for a rebuild. Edits made elsewhere
+    are picked up by the full rebuild every `rebuild_seconds`.
+    """
+
+    def __init__(self, cache_size=2048, scan_limit=20000, check_seconds=5, rebuild_seconds=3600):
+        self.cache_size = cache_size
+        self.scan_limit = scan_limit
+        self.check_seconds = check_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._reset()
+
+    def _reset(self):
+        self.keys = []                 # sorted tokens
+        self.refs = array('I')         # suggestion id, parallel to keys
+        self.entries = []              # suggestion id -> (item, make, rate) or None once gone
+        self.weights = array('I')      # suggestion id -> live row count
+        self.by_text = {}              # (item, make) -> suggestion id
+        self.max_id = 0                # highest ProductData.id indexed
+        self.rows = 0                  # live ProductData rows indexed
+        self.dead = 0
+        self.built = False
+        self.needs_catch_up = False
+        self.build_seconds = 0.0
+        self.built_at = 0.0
+        self.checked_at = 0.0
+        self._cache.clear()
+
+    # --- building ---
+
+    def build(self):
+        """Full build from ProductData, streamed so millions of rows stay cheap."""
+        from .models import ProductData
+        started = time.perf_counter()
+        with self._lock:
+            self._reset()
+            runs = []
+            stmt = select(ProductData.id, ProductData.item_description, ProductData.cat_no,
+                          ProductData.make, ProductData.rate
+                          ).order_by(ProductData.id).execution_options(yield_per=10000)
+            with db.engine.connect() as conn:
+                for rows in conn.execute(stmt).partitions():
+                    pairs = []
+                    for row in rows:
+                        eid, is_new = self._add_entry(row.item_description, row.make, row.rate)
+                        if is_new:
+                            pairs.extend((k, eid) for k in _tokens(row.item_description, None, row.make))
+                        if row.cat_no:
+                            pairs.extend((k, eid) for k in _tokens(None, row.cat_no, None))
+                        self.max_id = row.id
+                    # Sorted runs merged below, rather than one sort that holds the GIL for seconds.
+                    pairs.sort()
+                    runs.append(pairs)
+                    time.sleep(0)  # yields to the hub under gevent/eventlet
+            for n, (k, eid) in enumerate(heapq.merge(*runs)):
+                self.keys.append(k)
+                self.refs.append(eid)
+                if not n % 100000:
+                    time.sleep(0)
+            self.built = True
+            self.built_at = self.checked_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+
+    def _add_entry(self, item, make, rate):
+        key = (item or '', make or '')
+        self.rows += 1
+        eid = self.by_text.get(key)
+        if eid is not None:
+            if self.entries[eid] is None:
+                self.dead -= 1
+            self.entries[eid] = (key[0], key[1], rate)
+            self.weights[eid] += 1
+            return eid, False
+        eid = len(self.entries)
+        self.entries.append((key[0], key[1], rate))
+        self.weights.append(1)
+        self.by_text[key] = eid
+        return eid, True
+
+    def _insert_keys(self, keys, eid):
+        for k in keys:
+            i = bisect_right(self.keys, k)
+            self.keys.insert(i, k)
+            self.refs.insert(i, eid)
+
+    def _remove_keys(self, keys, eid):
+        for k in keys:
+            lo, hi = bisect_left(self.keys, k), bisect_right(self.keys, k)
+            for i in range(lo, hi):
+                if self.refs[i] == eid:
+                    del self.keys[i]
+                    del self.refs[i]
+                    break
+
+    def add(self, item, cat_no, make, rate):
+        with self._lock:
+            eid, is_new = self._add_entry(item, make, rate)
+            # Catalog-number keys are kept per row (as in build), so remove() can drop them again.
+            if is_new:
+                self._insert_keys(_tokens(item, None, make), eid)
+            self._insert_keys(_tokens(None, cat_no, None), eid)
+            self._cache.clear()
+
+    def remove(self, item, cat_no, make):
+        with self._lock:
+            eid = self.by_text.get((item or '', make or ''))
+            if eid is None or self.entries[eid] is None:
+                return
+            self._remove_keys(_tokens(None, cat_no, None), eid)
+            self.weights[eid] -= 1
+            self.rows -= 1
+            if self.weights[eid] == 0:
+                # Description keys keep pointing at the tombstone until the next rebuild.
+                self.entries[eid] = None
+                self.dead += 1
+            self._cache.clear()
+
+    def _catch_up(self, upto=None) -> bool:
+        from .models import ProductData
+        stmt = (select(ProductData.id, ProductData.item_description, ProductData.cat_no,
+                       ProductData.make, ProductData.rate)
+                .where(ProductData.id > self.max_id).order_by(ProductData.id))
+        if upto is not None:
+            stmt = stmt.where(ProductData.id <= upto)
+        with db.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        if len(rows) > max(1000, len(self.entries) // 10):
+            return False  # a bulk import; one build beats many list inserts
+        for row in rows:
+            self.add(row.item_description, row.cat_no, row.make, row.rate)
+            self.max_id = row.id
+        return True
+
+    def _check_database(self) -> bool:
+        from .models import ProductData
+        with db.engine.connect() as conn:
+            max_id, count = conn.execute(select(func.max(ProductData.id), func.count(ProductData.id))).one()
+        # Bounded by the same snapshot, so rows inserted meanwhile don't skew the count.
+        if (max_id or 0) > self.max_id and not self._catch_up(upto=max_id):
+            return False
+        return count == self.rows
+
+    def refresh(self) -> bool:
+        """Catches up with the database; False when only a rebuild can."""
+        now = time.monotonic()
+        if self.dead > len(self.entries) // 4 or now - self.built_at >= self.rebuild_seconds:
+            return False
+        if self.needs_catch_up:
+            self.needs_catch_up = False
+            if not self._catch_up():
+                return False
+        if now - self.checked_at >= self.check_seconds:
+            self.checked_at = now
+            return self._check_database()
+        return True
+
+    # --- querying ---
+
+    def suggest(self, query: str, k: int = 5):
+        """Top-k (item, make, rate) whose tokens start with the last word and contain the others."""
+        words = TOKEN_RE.findall(query.lower())
+        if not words:
+            return []
+        raw = query.lower().strip()
+        if ' ' in raw or len(words) == 1:
+            return self._lookup(words[-1], tuple(words[:-1]), k)
+        # Punctuated single term ('zx-9'): full catalog numbers / makes first, then
+        # its words, so 'o-ring' or 'n-hexane' still find descriptions.
+        top = self._lookup(raw, (), k)
+        if len(top) < k:
+            top = top + [e for e in self._lookup(words[-1], tuple(words[:-1]), k) if e not in top]
+        return top[:k]
+
+    def _lookup(self, prefix, required, k):
+        cache_key = (prefix, required, k)
+        with self._lock:
+            hit = self._cache.get(cache_key)
+            if hit is not None:
+                self._cache.move_to_end(cache_key)
+                return hit
+
+            lo = bisect_left(self.keys, prefix)
+            hi = min(bisect_left(self.keys, prefix + '\uffff'), lo + self.scan_limit)
+            seen = set()
+            token_eids = {}
+            candidates = []
+            for eid in self.refs[lo:hi]:
+                if eid in seen:
+                    continue
+                seen.add(eid)
+                entry = self.entries[eid]
+                if entry is None:
+                    continue
+                if required:
+                    text = f'{entry[0]} {entry[1]}'.lower()
+                    if not all(w in text or eid in self._exact(w, token_eids) for w in required):
+                        continue
+                candidates.append((self.weights[eid], eid))
+            top = [self.entries[eid] for _, eid in heapq.nlargest(k, candidates)]
+
+            self._cache[cache_key] = top
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return top
+
+    def _exact(self, word, memo):
+        # Suggestions holding `word` as a whole token, e.g. a catalog-number part
+        # that never appears in the description text. Built once per query.
+        if word not in memo:
+            lo = bisect_left(self.keys, word)
+            hi = min(bisect_right(self.keys, word), lo + self.scan_limit)
+            memo[word] = set(self.refs[lo:hi])
+        return memo[word]
+
+    def stats(self) -> dict:
+        """Counts and an approximate deep size of the index in bytes."""
+        with self._lock:
+            seen = set()
+
+            def size(obj):
+                if id(obj) in seen:
+                    return 0
+                seen.add(id(obj))
+                return sys.getsizeof(obj)
+
+            nbytes = size(self.keys) + sum(size(k) for k in self.keys)
+            nbytes += size(self.refs) + size(self.weights)
+            nbytes += size(self.entries) + size(self.by_text)
+            for entry in self.entries:
+                if entry is not None:
+                    nbytes += size(entry) + sum(size(v) for v in entry)
+            for key in self.by_text:
+                nbytes += size(key)
+            return {
+                'suggestions': len(self.entries) - self.dead, 'tombstones': self.dead,
+                'rows': self.rows, 'keys': len(self.keys), 'max_product_id': self.max_id,
+                'cached_prefixes': len(self._cache), 'build_seconds': round(self.build_seconds, 3),
+                'memory_bytes': nbytes,
+            }
+
+
+index = None            # the live PrefixIndex; None until its first build finishes
+_options = {}           # PrefixIndex settings from the app config
+_swap_lock = threading.Lock()
+_pending = None         # changes committed while a build runs, replayed onto it
+_refresher = None
+
+
+def rebuild():
+    """Builds a fresh index and swaps it in. Requests keep reading the old one meanwhile."""
+    global index, _pending
+    fresh = PrefixIndex(**_options)
+    with _swap_lock:
+        # A change committed just as the build starts may be replayed twice; the
+        # row count then disagrees and the next check rebuilds again.
+        _pending = []
+    try:
+        fresh.build()
+    except Exception:
+        with _swap_lock:
+            _pending = None
+        raise
+    with _swap_lock:
+        for op, args in _pending:
+            _apply(fresh, op, args)
+        _pending = None
+        index = fresh
+    return fresh
+
+
+class _Refresher:
+    """Daemon thread that builds, polls and catches up, so requests never wait on it."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.wake = threading.Event()
+        threading.Thread(target=self.run, name='autocomplete-refresh', daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    live = index
+                    if live is None or not live.refresh():
+                        rebuild()
+            except Exception:
+                self.app.logger.exception('Typeahead refresh failed')
+            self.wake.wait(self.app.config['AUTOCOMPLETE_CHECK_SECONDS'])
+            self.wake.clear()
+
+
+def current():
+    """
+    The live index, or None while the first build runs (callers fall back to SQL).
+    Starts this process's refresher on first use, so each forked worker gets its own.
+    """
+    global _refresher
+    if _refresher is None or _refresher.pid != os.getpid():
+        with _swap_lock:
+            if _refresher is None or _refresher.pid != os.getpid():
+                _refresher = _Refresher(current_app._get_current_object())
+    return index
+
+
+# Changes are staged per session and applied only when it commits.
+def _stage(session, op, *args):
+    if session is not None:
+        session.info.setdefault('autocomplete', []).append((op, args))
+
+
+def _after_insert(mapper, connection, target):
+    _stage(inspect(target).session, 'catch_up')
+
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+
+    def old(attr):
+        deleted = state.attrs[attr].history.deleted
+        return deleted[0] if deleted else getattr(target, attr)
+
+    _stage(state.session, 'remove', target.id, old('item_description'), old('cat_no'), old('make'))
+    _stage(state.session, 'add', target.id, target.item_description, target.cat_no, target.make, target.rate)
+
+
+def _after_delete(mapper, connection, target):
+    _stage(inspect(target).session, 'remove', target.id, target.item_description, target.cat_no, target.make)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    # Registered with active_history, so an expired attribute is loaded before it is
+    # overwritten and _after_update can drop the keys of the old value.
+    return value
+
+
+def _apply(target, op, args):
+    if op == 'catch_up':
+        target.needs_catch_up = True
+    elif args[0] <= target.max_id:
+        # Rows past the watermark are not indexed yet; the catch-up reads their current values.
+        getattr(target, op)(*args[1:])
+
+
+def _after_commit(session):
+    ops = session.info.pop('autocomplete', None)
+    if not ops:
+        return
+    with _swap_lock:
+        for op, args in ops:
+            if index is not None:
+                _apply(index, op, args)
+            if _pending is not None:
+                _pending.append((op, args))
+    if _refresher is not None and _refresher.pid == os.getpid():
+        _refresher.wake.set()
+
+
+def _after_rollback(session):
+    session.info.pop('autocomplete', None)
+
+
+def init_autocomplete(app):
+    """Configures the index and hooks ProductData changes into it."""
+    global index, _refresher
+    from .models import ProductData
+    from .database import RoutingSession
+    _options.update(cache_size=app.config['AUTOCOMPLETE_CACHE_SIZE'],
+                    check_seconds=app.config['AUTOCOMPLETE_CHECK_SECONDS'],
+                    rebuild_seconds=app.config['AUTOCOMPLETE_REBUILD_SECONDS'])
+    index = _refresher = None
+
+    if not event.contains(ProductData, 'after_insert', _after_insert):
+        event.listen(ProductData, 'after_insert', _after_insert)
+        event.listen(ProductData, 'after_update', _after_update)
+        for attr in (ProductData.item_description, ProductData.cat_no, ProductData.make):
+            event.listen(attr, 'set', _load_old_value, active_history=True, retval=True)
+        event.listen(ProductData, 'after_delete', _after_delete)
+        event.listen(RoutingSession, 'after_commit', _after_commit)
+        event.listen(RoutingSession, 'after_rollback', _after_rollback)
+
+
+def preload(app):
+    """
+    Builds the index in the gunicorn master (AUTOCOMPLETE_PRELOAD=1, via when_ready),
+    so preloaded workers share it copy-on-write instead of each building their own.
+    Not run from create_app(): `flask init-db` loads the app before any table exists.
+    """
+    if not (app.config['AUTOCOMPLETE'] and app.config['AUTOCOMPLETE_PRELOAD']):
+        return
+    with app.app_context():
+        try:
+            rebuild()
+        except Exception:
+            app.logger.exception('Typeahead preload failed; workers build it on first search')
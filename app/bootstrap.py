@@ -0,0 +1,47 @@
+import click
+from . import db
+from .models import User, SiteFlag
+
+
+def bootstrap_db():
+    """
+    Creates missing tables and backfills the 'first_admin_created' flag.
+    Runs once per deploy via `flask init-db` (or on boot when AUTO_BOOTSTRAP=1).
+    """
+    db.create_all()
+
+    try:
+        if not SiteFlag.query.filter_by(key='first_admin_created').first():
+            if User.query.filter_by(role='Admin').count() > 0:
+                db.session.add(SiteFlag(key='first_admin_created', value='1'))
+                db.session.commit()
+                print("System: Backfilled 'first_admin_created' flag.")
+    except Exception:
+        db.session.rollback()
+
+
+def register_cli(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and backfill site flags."""
+        bootstrap_db()
+        click.echo('Database ready.')
+
+    @app.cli.command('sweep-sessions')
+    def sweep_sessions_command():
+        """Delete expired server-side sessions."""
+        store = getattr(app.session_interface, 'store', None)
+        if store is None:
+            click.echo('SESSION_BACKEND=cookie; nothing to sweep.')
+            return
+        click.echo(f'Removed {store.sweep()} expired sessions.')
+
+    @app.cli.command('autocomplete-stats')
+    def autocomplete_stats_command():
+        """Build the typeahead index and print its size."""
+        from . import autocomplete
+        if not app.config['AUTOCOMPLETE']:
+            click.echo('AUTOCOMPLETE=0; index disabled.')
+            return
+        for key, value in autocomplete.rebuild().stats().items():
+            click.echo(f'{key}: {value}')
@@ -0,0 +1,117 @@
+import os
+from functools import wraps
+from flask import g
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Tuned for a single-node SQLite deployment: readers never block the writer (WAL),
+# fsync only at checkpoints, and a 20 MB page cache per connection.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', '5000'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', '-20000'),
+    ('mmap_size', '268435456'),
+)
+
+
+def _is_sqlite(db_url: str) -> bool:
+    return make_url(db_url).get_backend_name() == 'sqlite'
+
+
+def _is_memory_sqlite(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def dispose_engines(app):
+    """
+    Drops pooled connections inherited from the parent process.
+    Call this in every forked worker (gunicorn post_fork) when the app is preloaded,
+    so workers never share a socket with the master. close=False leaves the parent's
+    connections untouched.
+    """
+    from . import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def engine_options(db_url: str, concurrency: int = 1) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS sized to how many requests one worker serves at once
+    (WORKER_CONCURRENCY: gthread threads or gevent/eventlet worker_connections).
+    Past DB_MAX_CONNECTIONS_PER_WORKER (the usual gevent/eventlet case) the pool is a hard
+    cap with no overflow, so a thousand greenlets queue for connections instead of
+    exhausting the database server.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING
+    override the derived values. Pre-ping costs a round trip per checkout, so it is on
+    by default only for networked databases.
+    """
+    default_pre_ping = '0' if _is_sqlite(db_url) else '1'
+    options = {
+        "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', default_pre_ping) == '1',
+        "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', '300')),
+    }
+    if _is_memory_sqlite(db_url):
+        # In-memory SQLite uses a single-connection pool with no sizing knobs.
+        return options
+
+    cap = int(os.environ.get('DB_MAX_CONNECTIONS_PER_WORKER', '20'))
+    if concurrency > 1:
+        options['pool_size'] = min(concurrency, cap)
+        options['max_overflow'] = 0 if concurrency > cap else min(concurrency, cap) // 2
+        options['pool_timeout'] = 30
+
+    if os.environ.get('DB_POOL_SIZE'):
+        options['pool_size'] = int(os.environ['DB_POOL_SIZE'])
+    if os.environ.get('DB_MAX_OVERFLOW'):
+        options['max_overflow'] = int(os.environ['DB_MAX_OVERFLOW'])
+    if os.environ.get('DB_POOL_TIMEOUT'):
+        options['pool_timeout'] = float(os.environ['DB_POOL_TIMEOUT'])
+    return options
+
+
+def init_sqlite_pragmas(app):
+    """Applies SQLITE_PRAGMAS to every new connection of the app's file-backed SQLite engines."""
+    from . import db
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and not _is_memory_sqlite(str(engine.url)):
+                event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Sends reads inside @read_replica views to the 'replica' bind (DATABASE_REPLICA_URL).
+    Flushes, and everything outside those views, go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and g and g.get('_use_replica'):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(fn):
+    """Marks a read-only view; its queries may be served by the replica."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g._use_replica = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g._use_replica = False
+    return wrapper
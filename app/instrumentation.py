@@ -0,0 +1,168 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import g, request, Response, abort, has_request_context
+from sqlalchemy import event
+from . import db
+
+# Request duration histogram buckets (seconds), Prometheus defaults.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_requests = Counter()              # (endpoint, method, status) -> count
+_duration_buckets = defaultdict(lambda: [0] * len(BUCKETS))
+_duration_sum = Counter()          # endpoint -> seconds
+_duration_count = Counter()        # endpoint -> requests
+_sql_queries = Counter()           # endpoint -> queries
+_sql_seconds = Counter()           # endpoint -> seconds
+_n_plus_one = Counter()            # endpoint -> flagged requests
+
+
+def init_instrumentation(app):
+    """
+    Opt-in per-request timing, SQL counting and N+1 detection (INSTRUMENTATION=1).
+    Counters live in process memory, so each gunicorn worker exposes its own /metrics.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def _start_request():
+        if request.endpoint in ('metrics', 'static'):
+            return
+        g._instr = {'start': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0,
+                    'statements': Counter(), 'profiler': None}
+        if random.random() < app.config['PROFILE_SAMPLE_RATE']:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this process (threaded workers).
+                return
+            g._instr['profiler'] = profiler
+
+    @app.after_request
+    def _finish_request(resp):
+        stats = g.get('_instr')
+        if stats is None:
+            return resp
+        elapsed = time.perf_counter() - stats['start']
+        endpoint = request.endpoint or 'unmatched'
+
+        worst_stmt, worst_count = (stats['statements'].most_common(1) or [(None, 0)])[0]
+        n_plus_one = worst_count >= app.config['N_PLUS_ONE_THRESHOLD']
+        if n_plus_one:
+            app.logger.warning('N+1 suspect on %s: %d x %s', endpoint, worst_count, ' '.join(worst_stmt.split())[:200])
+
+        with _lock:
+            _requests[(endpoint, request.method, resp.status_code)] += 1
+            buckets = _duration_buckets[endpoint]
+            for i, le in enumerate(BUCKETS):
+                if elapsed <= le:
+                    buckets[i] += 1
+            _duration_sum[endpoint] += elapsed
+            _duration_count[endpoint] += 1
+            _sql_queries[endpoint] += stats['queries']
+            _sql_seconds[endpoint] += stats['sql_seconds']
+            if n_plus_one:
+                _n_plus_one[endpoint] += 1
+
+        stats['elapsed'] = elapsed
+        resp.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={stats["sql_seconds"] * 1000:.1f};desc="{stats["queries"]} queries"'
+        )
+        return resp
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        # Teardown always runs, so a sampled profiler is never left enabled.
+        stats = g.pop('_instr', None)
+        profiler = stats and stats['profiler']
+        if profiler is None:
+            return
+        profiler.disable()
+        elapsed = stats.get('elapsed', time.perf_counter() - stats['start'])
+        if elapsed * 1000 >= app.config['PROFILE_THRESHOLD_MS']:
+            _dump_profile(app, profiler, request.endpoint or 'unmatched')
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_instr_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_instr_start'].pop()
+    if not has_request_context():
+        return
+    stats = g.get('_instr')
+    if stats is None:
+        return
+    stats['queries'] += 1
+    stats['sql_seconds'] += time.perf_counter() - started
+    # Statements are parametrised, so identical text means the same query shape.
+    stats['statements'][statement] += 1
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_instr_start'):
+        conn.info['_instr_start'].pop()
+
+
+def _dump_profile(app, profiler, endpoint):
+    target_dir = app.config['PROFILE_DIR']
+    os.makedirs(target_dir, exist_ok=True)
+    fname = f"{endpoint}-{int(time.time() * 1000)}-{os.getpid()}.prof"
+    profiler.dump_stats(os.path.join(target_dir, fname))
+
+
+def _labels(**kw):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in kw.items()) + '}'
+
+
+def render_metrics() -> str:
+    lines = []
+    with _lock:
+        lines += ['# HELP edudap_requests_total HTTP requests handled.',
+                  '# TYPE edudap_requests_total counter']
+        for (endpoint, method, status), n in sorted(_requests.items()):
+            lines.append(f'edudap_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}')
+
+        lines += ['# HELP edudap_request_duration_seconds Request wall time.',
+                  '# TYPE edudap_request_duration_seconds histogram']
+        for endpoint in sorted(_duration_count):
+            for le, n in zip(BUCKETS, _duration_buckets[endpoint]):
+                lines.append(f'edudap_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=le)} {n}')
+            lines.append(f'edudap_request_duration_seconds_bucket{_labels(endpoint=endpoint, le="+Inf")} {_duration_count[endpoint]}')
+            lines.append(f'edudap_request_duration_seconds_sum{_labels(endpoint=endpoint)} {_duration_sum[endpoint]:.6f}')
+            lines.append(f'edudap_request_duration_seconds_count{_labels(endpoint=endpoint)} {_duration_count[endpoint]}')
+
+        lines += ['# HELP edudap_sql_queries_total SQL statements executed while serving requests.',
+                  '# TYPE edudap_sql_queries_total counter']
+        for endpoint, n in sorted(_sql_queries.items()):
+            lines.append(f'edudap_sql_queries_total{_labels(endpoint=endpoint)} {n}')
+
+        lines += ['# HELP edudap_sql_duration_seconds_total Time spent in SQL while serving requests.',
+                  '# TYPE edudap_sql_duration_seconds_total counter']
+        for endpoint, s in sorted(_sql_seconds.items()):
+            lines.append(f'edudap_sql_duration_seconds_total{_labels(endpoint=endpoint)} {s:.6f}')
+
+        lines += ['# HELP edudap_n_plus_one_total Requests that repeated one query shape past N_PLUS_ONE_THRESHOLD.',
+                  '# TYPE edudap_n_plus_one_total counter']
+        for endpoint, n in sorted(_n_plus_one.items()):
+            lines.append(f'edudap_n_plus_one_total{_labels(endpoint=endpoint)} {n}')
+    return '\n'.join(lines) + '\n'
@@ -37,3 +37,9 @@ class ProductData(db.Model):
     item_description = db.Column(db.Text)
     make = db.Column(db.String(100))
     rate = db.Column(db.String(50))
+
+class ServerSession(db.Model):
+    __tablename__ = 'server_sessions'
+    sid = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, index=True, nullable=False)
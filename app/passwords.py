@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Every hashing slot stayed taken for PASSWORD_HASH_WAIT seconds."""
+
+
+_lock = threading.Lock()
+_pool = None
+_slots = None
+_pool_pid = None
+
+
+def _executor():
+    # Built lazily per process so a preloaded gunicorn master never forks a live pool.
+    global _pool, _slots, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                workers = current_app.config['PASSWORD_HASH_WORKERS']
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+                # Running + queued jobs; anything beyond this waits, then gets HashingBusy.
+                _slots = threading.BoundedSemaphore(workers * 2)
+                _pool_pid = os.getpid()
+    return _pool, _slots
+
+
+def _green_threadpool():
+    """
+    A native-thread runner when gevent or eventlet has patched `threading`, else None.
+    Patched executor threads are green, so a hash on them would block the hub.
+    """
+    if 'gevent' in sys.modules:
+        from gevent import monkey, get_hub
+        if monkey.is_module_patched('threading'):
+            return lambda fn, args: get_hub().threadpool.apply(fn, args)
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return lambda fn, args: tpool.execute(fn, *args)
+    return None
+
+
+def _offload(fn, *args):
+    """
+    Runs a CPU-bound hash off the request thread, bounded by PASSWORD_HASH_WORKERS.
+    hashlib and argon2 release the GIL, so real threads hash in parallel.
+    Under gevent or eventlet the hub's native threadpool is used instead.
+    """
+    pool, slots = _executor()
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_WAIT']):
+        raise HashingBusy()
+    try:
+        run = _green_threadpool()
+        if run is not None:
+            return run(fn, args)
+        return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+@lru_cache(maxsize=None)
+def _argon2_hasher(method: str):
+    try:
+        from argon2 import PasswordHasher
+    except ImportError:
+        raise RuntimeError('PASSWORD_HASH_METHOD=argon2 requires the argon2-cffi package')
+    # 'argon2' or 'argon2:<time_cost>:<memory_kib>:<parallelism>', like werkzeug's 'scrypt:n:r:p'
+    params = [int(p) for p in method.split(':')[1:]]
+    time_cost, memory_cost, parallelism = params if params else (3, 65536, 4)
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+@lru_cache(maxsize=None)
+def _werkzeug_prefix(method: str) -> str:
+    # Werkzeug stores the fully resolved method ('pbkdf2:sha256:1000000') before the first '$'.
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def _hash(method: str, password: str) -> str:
+    if method.startswith('argon2'):
+        return _argon2_hasher(method).hash(password)
+    return generate_password_hash(password, method=method)
+
+
+def _needs_rehash(method: str, pwhash: str) -> bool:
+    if method.startswith('argon2'):
+        return not pwhash.startswith('$argon2') or _argon2_hasher(method).check_needs_rehash(pwhash)
+    return pwhash.split('$', 1)[0] != _werkzeug_prefix(method)
+
+
+def _verify_and_update(method: str, pwhash: str, password: str):
+    if pwhash.startswith('$argon2'):
+        from argon2.exceptions import VerificationError, InvalidHashError
+        hasher = _argon2_hasher(method if method.startswith('argon2') else 'argon2')
+        try:
+            ok = hasher.verify(pwhash, password)
+        except (VerificationError, InvalidHashError):
+            ok = False
+    else:
+        ok = check_password_hash(pwhash, password)
+    if ok and _needs_rehash(method, pwhash):
+        return True, _hash(method, password)
+    return ok, None
+
+
+def hash_password(password: str) -> str:
+    """Hashes with PASSWORD_HASH_METHOD on the bounded pool. May raise HashingBusy."""
+    return _offload(_hash, current_app.config['PASSWORD_HASH_METHOD'], password)
+
+
+def verify_password(pwhash: str, password: str):
+    """
+    Returns (ok, new_hash). new_hash is set when the password matched but was stored
+    with other parameters than PASSWORD_HASH_METHOD; the caller saves it. May raise HashingBusy.
+    """
+    return _offload(_verify_and_update, current_app.config['PASSWORD_HASH_METHOD'], pwhash, password or '')
@@ -0,0 +1,41 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """
+    In-process token bucket keyed by client (IP, email, ...).
+    Each key holds up to `burst` tokens and regains `per_minute` tokens a minute.
+    `empty()` costs a dict lookup, so floods are rejected before any password hashing;
+    callers `charge()` only for attempts that should count (failed logins).
+    State is per worker process; the effective limit scales with the worker count.
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int = 100000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def empty(self, key) -> bool:
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                return False
+            tokens, last = state
+            return tokens + (time.monotonic() - last) * self.rate < 1
+
+    def charge(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._refill(key, now)
+            self._buckets[key] = (max(0.0, tokens - 1), now)
+            # Least recently charged keys go first; they are the likeliest to be full again.
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
@@ -0,0 +1,208 @@
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from sqlalchemy import delete, insert, select, update
+from . import db
+
+
+def _new_sid() -> str:
+    # 256 random bits; the cookie carries only this id, so it is never signed.
+    return secrets.token_urlsafe(32)
+
+
+class SQLSessionStore:
+    """Sessions in the server_sessions table, shared by every worker."""
+
+    def __init__(self):
+        from .models import ServerSession
+        self.table = ServerSession.__table__
+
+    def load(self, sid):
+        # Own connection, so session I/O never joins the request's db.session transaction.
+        with db.engine.connect() as conn:
+            row = conn.execute(select(self.table.c.data, self.table.c.expires_at)
+                               .where(self.table.c.sid == sid)).first()
+        return (row.data, row.expires_at) if row else None
+
+    def save(self, sid, data, expires_at):
+        with db.engine.begin() as conn:
+            res = conn.execute(update(self.table).where(self.table.c.sid == sid)
+                               .values(data=data, expires_at=expires_at))
+            if res.rowcount == 0:
+                conn.execute(insert(self.table).values(sid=sid, data=data, expires_at=expires_at))
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.sid == sid))
+
+    def sweep(self) -> int:
+        with db.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.expires_at < datetime.utcnow())).rowcount
+
+
+class MemorySessionStore:
+    """Process-local dict. Only for a single worker (dev server, one gunicorn worker)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        return self._data.get(sid)
+
+    def save(self, sid, data, expires_at):
+        with self._lock:
+            self._data[sid] = (data, expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [sid for sid, (_, exp) in self._data.items() if exp < now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+STORES = {'sql': SQLSessionStore, 'memory': MemorySessionStore}
+
+
+class ServerSideSession(SessionMixin):
+    """
+    Session whose data lives in a store, keyed by the sid cookie.
+    Nothing is read from the store until a key is touched, and `modified`
+    only flips on writes, so untouched or read-only requests cost no store write.
+    """
+
+    def __init__(self, sid, loader=None):
+        self.sid = sid
+        self.new = loader is None
+        self.modified = False
+        self.accessed = False
+        self.rotated_from = None
+        self.expires_at = None
+        self._loader = loader
+        self._data = {} if loader is None else None
+
+    def _load(self):
+        self.accessed = True
+        if self._data is None:
+            loaded = self._loader(self.sid)
+            if loaded is None:
+                # Unknown or expired id: never adopt a client-chosen sid.
+                self.sid, self.new, self._data = _new_sid(), True, {}
+            else:
+                self._data, self.expires_at = loaded
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def clear(self):
+        # Cleared sessions (login, logout) get a fresh id, which also blocks session fixation.
+        self.accessed = True
+        if not self.new:
+            self.rotated_from = self.sid
+            self.sid, self.new = _new_sid(), True
+        self._data = {}
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps only a random session id in the cookie (SESSION_BACKEND=sql|memory).
+    The cookie is set when the id is new, and the store is written only when the
+    session was modified or is past half its lifetime. Expired rows are swept by
+    a daemon thread every SESSION_SWEEP_INTERVAL seconds (or `flask sweep-sessions`).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._sweeper_pid = None
+
+    def _load(self, sid):
+        loaded = self.store.load(sid)
+        if loaded is None or loaded[1] < datetime.utcnow():
+            return None
+        return session_json_serializer.loads(loaded[0]), loaded[1]
+
+    def open_session(self, app, request):
+        self._ensure_sweeper(app)
+        # The URL is not matched yet, so check the path. Assets get a read-only empty
+        # session that Flask never saves, so flask-login's after_request reads hit no store.
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            return self.make_null_session(app)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > 64:
+            return ServerSideSession(_new_sid())
+        return ServerSideSession(sid, loader=self._load)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.rotated_from:
+            self.store.delete(session.rotated_from)
+
+        if not session.modified:
+            lifetime = app.permanent_session_lifetime
+            # Sliding expiry without a write per request: refresh once half the lifetime is gone.
+            if not (session.expires_at and session.expires_at - datetime.utcnow() < lifetime / 2):
+                return
+        elif not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if session.rotated_from or not session.new:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        self.store.save(session.sid, session_json_serializer.dumps(dict(session)),
+                        datetime.utcnow() + app.permanent_session_lifetime)
+        if session.new or session.permanent:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+    def _ensure_sweeper(self, app):
+        # Started lazily, so each forked worker runs its own thread.
+        interval = app.config['SESSION_SWEEP_INTERVAL']
+        if interval <= 0 or self._sweeper_pid == os.getpid():
+            return
+        self._sweeper_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context():
+                        self.store.sweep()
+                except Exception:
+                    app.logger.exception('Session sweep failed')
+
+        threading.Thread(target=run, name='session-sweeper', daemon=True).start()
@@ -0,0 +1,189 @@
+"""
+Latency/throughput benchmark for the hot endpoints.
+
+In-process, through the Flask test client (no network, measures app + DB):
+    DATABASE_URL=sqlite:///bench.sqlite3 python bench/endpoints.py --requests 500
+
+Against a running server, with a concurrent HTTP load generator:
+    python bench/endpoints.py --url http://127.0.0.1:8000 --concurrency 32 --requests 2000
+
+Seed the database first with bench/seed.py. Routes missing from this tree's
+url_map are reported as skipped.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from bench.seed import BENCH_EMAIL, BENCH_PASSWORD
+
+# (label, method, path, json body)
+TARGETS = [
+    ('search', 'GET', '/admin/api/search?q=steri', None),
+    ('dashboard', 'GET', '/admin/dashboard?q=flask', None),
+    ('ping', 'POST', '/location/ping', {'lat': 19.07, 'lon': 72.87, 'accuracy': 12}),
+    ('latest', 'GET', '/location/admin/latest', None),
+    ('leave_events', 'GET', '/leave/events', None),
+]
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    k = max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[k]
+
+
+def _routable(app, method, path):
+    adapter = app.url_map.bind('localhost')
+    try:
+        adapter.match(urllib.parse.urlsplit(path).path, method=method)
+        return True
+    except Exception:
+        return False
+
+
+class ClientDriver:
+    """Flask test client; one client (cookie jar) per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def ensure_session(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.app.test_client()
+            resp = client.post('/auth/login', data={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD},
+                               base_url='https://localhost')
+            if resp.status_code != 302:
+                raise RuntimeError('bench login failed; run bench/seed.py first')
+            self.local.client = client
+        return client
+
+    def request(self, method, path, body):
+        resp = self.ensure_session().open(path, method=method, json=body, base_url='https://localhost')
+        resp.close()
+        return resp.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpDriver:
+    """Plain urllib against a live server; the login cookies are replayed by hand."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        opener = urllib.request.build_opener(_NoRedirect)
+        data = urllib.parse.urlencode({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}).encode()
+        try:
+            resp = opener.open(self.base_url + '/auth/login', data=data)
+        except urllib.error.HTTPError as e:
+            resp = e
+        cookies = [c.split(';', 1)[0] for c in resp.headers.get_all('Set-Cookie') or []]
+        if resp.status != 302 or not cookies:
+            raise RuntimeError('bench login failed; run bench/seed.py against the server database first')
+        self.cookie = '; '.join(cookies)
+
+    def ensure_session(self):
+        pass
+
+    def request(self, method, path, body):
+        headers = {'Cookie': self.cookie}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def start_pool(driver, concurrency):
+    """
+    One long-lived pool for every endpoint. Each worker thread logs in here, before
+    any clock starts; the barrier forces all `concurrency` threads to exist.
+    """
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    barrier = threading.Barrier(concurrency)
+
+    def login(_):
+        driver.ensure_session()
+        barrier.wait()
+
+    list(pool.map(login, range(concurrency)))
+    return pool
+
+
+def run_target(pool, driver, method, path, body, total):
+    def one(_):
+        t0 = time.perf_counter()
+        status = driver.request(method, path, body)
+        return time.perf_counter() - t0, status
+
+    started = time.perf_counter()
+    results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if r[1] >= 400)
+    return {
+        'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'p99': percentile(latencies, 99),
+        'mean': statistics.fmean(latencies), 'rps': total / wall, 'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot endpoints.')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--requests', type=int, default=300, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='endpoint labels to run')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    app = create_app()
+    driver = HttpDriver(args.url) if args.url else ClientDriver(app)
+    pool = start_pool(driver, args.concurrency)
+
+    report = {}
+    print(f"{'endpoint':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'req/s':>10}{'errors':>8}")
+    for label, method, path, body in TARGETS:
+        if args.only and label not in args.only:
+            continue
+        if not _routable(app, method, path):
+            print(f"{label:<14}skipped: {method} {path} is not registered")
+            continue
+        list(pool.map(lambda _: driver.request(method, path, body), range(args.warmup)))
+        r = run_target(pool, driver, method, path, body, args.requests)
+        report[label] = r
+        print(f"{label:<14}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}{r['mean']:>9.2f}{r['rps']:>10.1f}{r['errors']:>8}")
+
+    pool.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'mode': 'http' if args.url else 'client', 'concurrency': args.concurrency,
+                       'requests': args.requests, 'results': report}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Seeds a synthetic dataset for the endpoint benchmarks.
+
+    DATABASE_URL=sqlite:///bench.sqlite3 python bench/seed.py --products 2000000
+
+Rows go in through chunked Core inserts, so millions of ProductData rows take
+seconds rather than minutes. Tables for models that this tree does not define
+(location pings, leaves, todos) are reported and skipped.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app import create_app, db, models
+
+BENCH_EMAIL = 'bench-admin@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+MAKES = ['Merck', 'Sigma', 'Himedia', 'Borosil', 'Tarsons', 'Thermo', 'Eppendorf', 'Qualigens', 'Loba', 'SRL']
+NOUNS = ['beaker', 'flask', 'pipette', 'burette', 'reagent', 'buffer', 'agar', 'broth', 'filter', 'cuvette',
+         'centrifuge', 'tube', 'slide', 'stain', 'indicator', 'solvent', 'ethanol', 'acetone', 'kit', 'media']
+ADJECTIVES = ['sterile', 'graduated', 'analytical', 'amber', 'conical', 'volumetric', 'disposable', 'anhydrous',
+              'molecular', 'nutrient', 'borosilicate', 'pure', 'micro', 'digital', 'standard']
+
+CHUNK = 10000
+
+
+def _chunks(rows_iter, size=CHUNK):
+    chunk = []
+    for row in rows_iter:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bulk(model, rows_iter):
+    n = 0
+    for chunk in _chunks(rows_iter):
+        db.session.execute(insert(model), chunk)
+        db.session.commit()
+        n += len(chunk)
+    return n
+
+
+def seed(users=200, quotations=2000, products=200000, pings=100000, leaves=5000, todos=20000, seed_value=42):
+    rnd = random.Random(seed_value)
+    db.drop_all()
+    db.create_all()
+
+    # One hash shared by every synthetic user keeps seeding cheap.
+    pw_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    db.session.add(models.User(username='bench-admin', email=BENCH_EMAIL, password_hash=pw_hash, role='Admin'))
+    db.session.add(models.SiteFlag(key='first_admin_created', value='1'))
+    db.session.commit()
+    _bulk(models.User, ({'username': f'user{i}', 'email': f'user{i}@example.com',
+                         'password_hash': pw_hash, 'role': 'Employee'} for i in range(users)))
+    user_ids = [u.id for u in models.User.query.with_entities(models.User.id)]
+
+    now = datetime.utcnow()
+    _bulk(models.Quotation, ({'filename': f'quote-{i:06d}.xlsx', 'file_type': 'xlsx',
+                              'upload_date': now - timedelta(minutes=i),
+                              'uploaded_by_id': rnd.choice(user_ids),
+                              'client_name': f'Client {i % 300}'} for i in range(quotations)))
+
+    def product_rows():
+        for i in range(products):
+            desc = f"{rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)} {rnd.choice([50, 100, 250, 500, 1000])}ml"
+            yield {'quotation_id': rnd.randint(1, quotations), 'cat_no': f'{rnd.choice("ABCDEFGH")}{i:07d}',
+                   'item_description': desc, 'make': rnd.choice(MAKES), 'rate': f'{rnd.uniform(10, 5000):.2f}'}
+    print(f"product_data: {_bulk(models.ProductData, product_rows())} rows")
+
+    optional = {
+        'LocationPing': (pings, lambda i: {'user_id': rnd.choice(user_ids), 'lat': rnd.uniform(8, 35),
+                                           'lon': rnd.uniform(68, 97), 'accuracy_m': rnd.uniform(3, 50),
+                                           'captured_at': now - timedelta(seconds=i * 30)}),
+        'HolidayRequest': (leaves, lambda i: {'user_id': rnd.choice(user_ids),
+                                              'start_date': now + timedelta(days=i % 365),
+                                              'end_date': now + timedelta(days=i % 365 + rnd.randint(0, 5)),
+                                              'reason': 'bench'}),
+        'Todo': (todos, lambda i: {'user_id': rnd.choice(user_ids), 'title': f'task {i}',
+                                   'due_date': now + timedelta(hours=i % 500)}),
+    }
+    for name, (count, make_row) in optional.items():
+        model = getattr(models, name, None)
+        if model is None:
+            print(f"{name}: skipped, model not defined in app.models")
+            continue
+        print(f"{model.__tablename__}: {_bulk(model, (make_row(i) for i in range(count)))} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a synthetic benchmark dataset (drops all tables first).')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--quotations', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=200000)
+    parser.add_argument('--pings', type=int, default=100000)
+    parser.add_argument('--leaves', type=int, default=5000)
+    parser.add_argument('--todos', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        seed(args.users, args.quotations, args.products, args.pings, args.leaves, args.todos)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Startup-time benchmark: how long a fresh worker takes to import and build the app.
+
+    python bench/startup.py --runs 10
+
+Each run is a new interpreter (cold imports), once with AUTO_BOOTSTRAP=1
+(create_all + backfill on boot, the old behaviour) and once with AUTO_BOOTSTRAP=0
+(what gunicorn workers do after `flask init-db`).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+create_app()
+t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t1:.6f}")
+"""
+
+
+def run_once(env):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    imp, build = out.strip().splitlines()[-1].split()
+    return float(imp), float(build)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}")
+        # Prime the schema so the AUTO_BOOTSTRAP=0 runs see an initialised database.
+        run_once(dict(env, AUTO_BOOTSTRAP='1'))
+
+        print(f"{'mode':<18}{'import ms':>12}{'create_app ms':>16}{'total ms':>12}")
+        for label, flag in (('AUTO_BOOTSTRAP=1', '1'), ('AUTO_BOOTSTRAP=0', '0')):
+            samples = [run_once(dict(env, AUTO_BOOTSTRAP=flag)) for _ in range(args.runs)]
+            imp = statistics.median(s[0] for s in samples) * 1000
+            build = statistics.median(s[1] for s in samples) * 1000
+            print(f"{label:<18}{imp:>12.1f}{build:>16.1f}{imp + build:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
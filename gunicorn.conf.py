@@ -0,0 +1,66 @@
+# Gunicorn settings, picked up automatically from the working directory.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# sync (default), gthread, gevent or eventlet. Cooperative workers keep a slow SMTP
+# send or a flood of location pings from pinning a whole process.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Import the app once in the master and fork workers from it.
+# Requires AUTO_BOOTSTRAP=0 + `flask init-db` on release, or bootstrap runs once here.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def _patch_psycopg():
+    # psycogreen (optional) makes psycopg2 yield to the hub while waiting on Postgres.
+    try:
+        if worker_class == 'gevent':
+            from psycogreen.gevent import patch_psycopg
+        else:
+            from psycogreen.eventlet import patch_psycopg
+    except ImportError:
+        return
+    patch_psycopg()
+
+
+cooperative = worker_class in ('gevent', 'eventlet')
+if cooperative:
+    concurrency = worker_connections
+    # A preloaded app creates locks and sockets in the master, so patch before it loads.
+    # Without preload the worker patches itself on boot.
+    if preload_app:
+        if worker_class == 'gevent':
+            from gevent import monkey
+            monkey.patch_all()
+        else:
+            import eventlet
+            eventlet.monkey_patch()
+        _patch_psycopg()
+else:
+    concurrency = threads
+
+# create_app() sizes the SQLAlchemy pool from this.
+os.environ.setdefault('WORKER_CONCURRENCY', str(concurrency))
+
+
+def when_ready(server):
+    # In the master, after the app is loaded and before any worker forks.
+    if server.cfg.preload_app:
+        from app.autocomplete import preload
+        preload(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    # Preloaded engines were created in the master; give each worker fresh pools.
+    if server.cfg.preload_app:
+        from app.database import dispose_engines
+        dispose_engines(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    if cooperative and not preload_app:
+        _patch_psycopg()